@@ -1,4 +1,5 @@
 import ast
+import copy
 import json
 import re
 import time
@@ -6,6 +7,7 @@ import inspect
 import asyncio
 import threading
 import logging
+from collections import OrderedDict
 from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from uuid import uuid4
@@ -290,6 +292,12 @@ class AgentStudio:
 
 
 class StudioWorkflow:
+    # Plan parsing depends only on the model output and the chapter title/goal, and
+    # workflows are built per request, so parsed plans are shared at class level.
+    _PLAN_PARSE_CACHE_SIZE = 128
+    _plan_parse_cache: "OrderedDict[Tuple[str, str, str], Tuple[dict, dict]]" = OrderedDict()
+    _plan_parse_lock = threading.Lock()
+
     def __init__(self, studio: AgentStudio, memory_search_func: Callable):
         self.studio = studio
         self.memory_search = memory_search_func
@@ -1193,6 +1201,25 @@ class StudioWorkflow:
 
     def _extract_plan_payload_with_quality(
         self, text: str, chapter: Chapter
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        key = (text, chapter.title, chapter.goal)
+        cls = type(self)
+        with cls._plan_parse_lock:
+            cached = cls._plan_parse_cache.get(key)
+            if cached is not None:
+                cls._plan_parse_cache.move_to_end(key)
+        if cached is None:
+            cached = self._parse_plan_payload_with_quality(text, chapter)
+            with cls._plan_parse_lock:
+                cls._plan_parse_cache[key] = cached
+                if len(cls._plan_parse_cache) > cls._PLAN_PARSE_CACHE_SIZE:
+                    cls._plan_parse_cache.popitem(last=False)
+        # Callers annotate the quality dict (attempt/attempts/retried); hand out copies.
+        payload, quality = cached
+        return copy.deepcopy(payload), copy.deepcopy(quality)
+
+    def _parse_plan_payload_with_quality(
+        self, text: str, chapter: Chapter
     ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         source = "goal_fallback"
         payload, parse_diag = self._load_json_object_payload_with_diag(text)
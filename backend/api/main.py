@@ -44,9 +44,9 @@ from models import (
     AgentRole,
     AgentTrace,
     Chapter,
-    CharacterProfile,
     ChapterPlan,
     ChapterStatus,
+    CharacterProfile,
     Conflict,
     EntityState,
     EventEdge,
@@ -3694,21 +3694,16 @@ async def import_project(file: UploadFile = File(...)):
                     _rows = []
                 finally:
                     _conn.close()
-                if _rows:
-                    for _old_pid, _data_json in _rows:
-                        try:
-                            _profile_data = json.loads(_data_json)
-                            _profile_data["project_id"] = new_project_id
-                            _char_name = _profile_data.get("character_name", "")
-                            _profile_data["profile_id"] = MemoryStore.make_profile_id(
-                                new_project_id, _char_name
-                            )
-                            _profile = CharacterProfile(**_profile_data)
-                            store.upsert_profile(_profile)
-                        except Exception:
-                            logger.warning(
-                                "L4 profile re-map failed for old_pid=%s", _old_pid, exc_info=True
-                            )
+                _profiles = []
+                for _old_pid, _data_json in _rows:
+                    try:
+                        _profiles.append(json.loads(_data_json))
+                    except Exception:
+                        logger.warning(
+                            "L4 profile re-map failed for old_pid=%s", _old_pid, exc_info=True
+                        )
+                if _profiles:
+                    store.import_dict(new_project_id, {"profiles": _profiles})
         except Exception:
             logger.warning("L4 import re-map failed project_id=%s", new_project_id, exc_info=True)
 
@@ -6241,10 +6236,8 @@ async def get_events(project_id: str):
     return [event.model_dump(mode="json") for event in events]
 
 
-@app.get("/api/projects/{project_id}/graph")
-async def get_graph_data(project_id: str):
-    """Return graph nodes and edges from L4 profiles + override layer."""
-    store = get_or_create_store(project_id)
+def build_project_graph(store: MemoryStore, project_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Build graph nodes and edges from L4 profiles + override layer."""
     try:
         profiles = store.list_profiles(project_id)
     except Exception:
@@ -6306,6 +6299,32 @@ async def get_graph_data(project_id: str):
     return {"nodes": nodes, "edges": edges}
 
 
+def graph_nodes_to_columns(graph: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Reshape ``build_project_graph`` output into parallel per-field node arrays."""
+    nodes = graph["nodes"]
+    return {
+        "node_ids": [n["id"] for n in nodes],
+        "node_labels": [n["label"] for n in nodes],
+        "node_overviews": [n["overview"] for n in nodes],
+        "node_personalities": [n["personality"] for n in nodes],
+        "node_is_manual": [n["is_manual"] for n in nodes],
+        "edges": graph["edges"],
+    }
+
+
+@app.get("/api/projects/{project_id}/graph")
+async def get_graph_data(project_id: str, format: str = "aos"):
+    """Return graph nodes and edges from L4 profiles + override layer.
+
+    ``format=soa`` returns parallel node arrays instead of a list of node objects,
+    which avoids repeating every key per node for large graphs.
+    """
+    if format not in ("aos", "soa"):
+        raise HTTPException(status_code=400, detail="format must be 'aos' or 'soa'")
+    graph = build_project_graph(get_or_create_store(project_id), project_id)
+    return graph_nodes_to_columns(graph) if format == "soa" else graph
+
+
 class CreateNodeRequest(BaseModel):
     label: str
     overview: str = ""
@@ -6478,13 +6497,33 @@ async def rebuild_profiles(project_id: str, req: RebuildRequest = None):
                 errors += 1
                 continue
             engine = ProfileMergeEngine()
+            merged_by_id: Dict[str, CharacterProfile] = {}
+            chapter_updated = 0
             for incoming in result.profiles:
                 if req.character_names and incoming.character_name not in req.character_names:
                     continue
-                existing = store.get_profile(incoming.profile_id)
-                merged = engine.merge(existing=existing, incoming=incoming)
-                store.upsert_profile(merged)
-                updated += 1
+                # One bad profile must not drop the rest of the chapter's batch.
+                try:
+                    existing = merged_by_id.get(incoming.profile_id) or store.get_profile(
+                        incoming.profile_id
+                    )
+                    merged_by_id[incoming.profile_id] = engine.merge(
+                        existing=existing, incoming=incoming
+                    )
+                except Exception:
+                    logger.warning(
+                        "rebuild merge failed ch=%d profile=%s project=%s",
+                        ch_num,
+                        incoming.profile_id,
+                        project_id,
+                        exc_info=True,
+                    )
+                    errors += 1
+                    continue
+                chapter_updated += 1
+            store.upsert_profiles_bulk(list(merged_by_id.values()))
+            # Only count profiles once they are actually written.
+            updated += chapter_updated
         except Exception:
             logger.warning(
                 "rebuild extraction failed ch=%d project=%s", ch_num, project_id, exc_info=True
@@ -5,6 +5,7 @@ import re
 import sqlite3
 from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from uuid import NAMESPACE_URL, uuid4, uuid5
@@ -15,6 +16,19 @@ from models import CharacterProfile, EntityState, EventEdge, Layer, MemoryItem
 
 logger = logging.getLogger(__name__)
 
+PROFILE_COLUMNS = (
+    "profile_id",
+    "project_id",
+    "character_name",
+    "data",
+    "created_at",
+    "updated_at",
+)
+PROFILE_UPSERT_SQL = (
+    f"INSERT OR REPLACE INTO character_profiles ({', '.join(PROFILE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(PROFILE_COLUMNS))})"
+)
+
 
 class ThreeLayerMemory:
     def __init__(self, project_path: str):
@@ -1017,22 +1031,29 @@ class MemoryStore:
     # ------------------------------------------------------------------
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def make_profile_id(project_id: str, character_name: str) -> str:
-        """Deterministic profile ID from project + character name."""
+        """Deterministic profile ID from project + character name.
+
+        The uuid5 (SHA-1) derivation is kept as-is because IDs are persisted;
+        results are memoized since graph/import paths re-derive the same IDs.
+        """
         key = f"{project_id}::{character_name.strip()}"
         return str(uuid5(NAMESPACE_URL, key))
 
     def upsert_profile(self, profile: CharacterProfile) -> None:
         """Insert or replace a character profile (full JSON blob)."""
-        profile.updated_at = datetime.now()
-        with self._connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO character_profiles
-                (profile_id, project_id, character_name, data, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
+        self.upsert_profiles_bulk([profile])
+
+    def upsert_profiles_bulk(self, profiles: List[CharacterProfile]) -> None:
+        """Insert or replace many character profiles in a single transaction."""
+        if not profiles:
+            return
+        now = datetime.now()
+        rows = []
+        for profile in profiles:
+            profile.updated_at = now
+            rows.append(
                 (
                     profile.profile_id,
                     profile.project_id,
@@ -1040,8 +1061,11 @@ class MemoryStore:
                     profile.model_dump_json(),
                     profile.created_at.isoformat(),
                     profile.updated_at.isoformat(),
-                ),
+                )
             )
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(PROFILE_UPSERT_SQL, rows)
             conn.commit()
 
     def get_profile(self, profile_id: str) -> Optional[CharacterProfile]:
@@ -1067,6 +1091,49 @@ class MemoryStore:
             )
             return [CharacterProfile.model_validate_json(row["data"]) for row in cursor.fetchall()]
 
+    def count_profiles(self, project_id: str) -> int:
+        """Count profiles for a project without loading their JSON payloads."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT COUNT(*) AS total FROM character_profiles WHERE project_id = ?",
+                (project_id,),
+            )
+            row = cursor.fetchone()
+            return int(row["total"] if row else 0)
+
+    def export_dict(self, project_id: str) -> Dict[str, Any]:
+        """Serialize a project's L4 profiles to a plain dict (no ZIP, no files)."""
+        return {
+            "project_id": project_id,
+            "profiles": [p.model_dump(mode="json") for p in self.list_profiles(project_id)],
+        }
+
+    def import_dict(self, project_id: str, payload: Dict[str, Any]) -> int:
+        """Load profiles from ``export_dict`` output into *project_id*.
+
+        Profile IDs are re-derived for the target project, so a payload exported
+        from another project is re-mapped the same way a ZIP import is. Entries
+        that fail validation are skipped. Returns the number of profiles written.
+        """
+        profiles: List[CharacterProfile] = []
+        for raw in payload.get("profiles") or []:
+            try:
+                data = dict(raw)
+                data["project_id"] = project_id
+                data["profile_id"] = self.make_profile_id(
+                    project_id, data.get("character_name", "")
+                )
+                profiles.append(CharacterProfile(**data))
+            except Exception:
+                logger.warning(
+                    "L4 profile import skipped profile_id=%s",
+                    raw.get("profile_id") if isinstance(raw, dict) else None,
+                    exc_info=True,
+                )
+        self.upsert_profiles_bulk(profiles)
+        return len(profiles)
+
     def delete_profile(self, profile_id: str) -> None:
         """Delete a profile by ID."""
         with self._connection() as conn:
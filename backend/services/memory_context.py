@@ -10,7 +10,7 @@ from pathlib import Path
 from typing import Optional, TypedDict
 
 from memory import ThreeLayerMemory, MemoryStore
-from utils.text_cleaner import clean_foreshadowing_text, extract_keywords
+from utils.text_cleaner import clean_foreshadowing_text, extract_keywords, iter_keywords
 
 logger = logging.getLogger(__name__)
 _logger = logging.getLogger("novelist.memory_context")
@@ -383,6 +383,7 @@ class MemoryContextService:
 
                 # Check resolution: callback_targets priority
                 fs_keywords = extract_keywords(cleaned)
+                fs_keyword_set = set(fs_keywords)
                 resolved = False
 
                 for later_ch in project_chapters:
@@ -408,9 +409,8 @@ class MemoryContextService:
                                 resolved = True
                                 break
                             # Also check keyword overlap with callback
-                            cb_keywords = extract_keywords(str(cb))
-                            if fs_keywords and cb_keywords:
-                                overlap = set(fs_keywords) & set(cb_keywords)
+                            if fs_keywords:
+                                overlap = fs_keyword_set.intersection(iter_keywords(str(cb)))
                                 if len(overlap) >= 2 or (
                                     len(overlap) == 1 and len(fs_keywords) <= 2
                                 ):
@@ -0,0 +1,106 @@
+"""Shared pytest fixtures for the backend test suite."""
+
+import os
+import re
+
+os.environ["REMOTE_LLM_ENABLED"] = "false"
+os.environ["REMOTE_EMBEDDING_ENABLED"] = "false"
+os.environ["GRAPH_FEATURE_ENABLED"] = "true"
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from memory import MemoryStore, ThreeLayerMemory
+from services.memory_context import MemoryContextService
+
+_MAIN_SOURCE_PATH = Path(__file__).resolve().parent.parent / "api" / "main.py"
+
+_DEF_RE = re.compile(r"^(?:async\s+)?def\s+(\w+)", re.M)
+# First column-0 line that is not a signature continuation (``) -> ...:``) or comment.
+_TOPLEVEL_RE = re.compile(r"^[^\s)#]", re.M)
+
+# Tables the memory service can write to; memory_fts follows memory_items via triggers.
+_STORE_TABLES = (
+    "memory_items",
+    "entities",
+    "events",
+    "character_profiles",
+    "graph_node_overrides",
+    "graph_node_aliases",
+    "graph_audit_log",
+)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient (and one app startup/shutdown) for the whole session."""
+    with TestClient(app) as c:
+        yield c
+
+
+def _index_function_sources(source: str) -> dict[str, str]:
+    """Map every top-level sync/async function name in *source* to its source slice."""
+    funcs: dict[str, str] = {}
+    for match in _DEF_RE.finditer(source):
+        header_end = source.find("\n", match.end())
+        end_match = _TOPLEVEL_RE.search(source, header_end + 1) if header_end != -1 else None
+        end = end_match.start() if end_match else len(source)
+        funcs.setdefault(match.group(1), source[match.start() : end].rstrip())
+    return funcs
+
+
+@pytest.fixture(scope="session")
+def main_source_funcs() -> dict[str, str]:
+    """api/main.py is large; slice it once per session and share the read-only index."""
+    return _index_function_sources(_MAIN_SOURCE_PATH.read_text(encoding="utf-8"))
+
+
+class MemoryServiceEnv:
+    """One ThreeLayerMemory/MemoryStore/MemoryContextService triple that can be reset in place."""
+
+    def __init__(self, project_dir: Path, db_path: Path):
+        self.project_dir = project_dir
+        self.tlm = ThreeLayerMemory(str(project_dir))
+        self.ms = MemoryStore(str(project_dir), str(db_path))
+        self.svc = MemoryContextService(self.tlm, self.ms)
+        self._snapshot = {p: p.read_bytes() for p in project_dir.rglob("*") if p.is_file()}
+        # Context packs built from a just-reset env, keyed by (chapter_number, chapters_json).
+        # Dies with the env, so nothing outlives the module's fixture.
+        self.pack_cache: dict[tuple[int, str], dict] = {}
+
+    def reset(self) -> None:
+        """Put the project files and DB rows back to their just-initialised state."""
+        for path in self.project_dir.rglob("*"):
+            if path.is_file() and path not in self._snapshot:
+                path.unlink()
+        for path, content in self._snapshot.items():
+            path.write_bytes(content)
+        with self.ms._connection() as conn:
+            for table in _STORE_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.commit()
+
+
+@pytest.fixture(scope="session")
+def ram_tmp(tmp_path_factory):
+    """Session scratch dir on tmpfs (/dev/shm) when the host has one, else pytest's basetemp."""
+    shm = Path("/dev/shm")
+    if not (shm.is_dir() and os.access(shm, os.W_OK)):
+        yield tmp_path_factory.mktemp("ram")
+        return
+    base = Path(tempfile.mkdtemp(prefix="morpheus-tests-", dir=shm))
+    yield base
+    shutil.rmtree(base, ignore_errors=True)
+
+
+@pytest.fixture(scope="module")
+def svc_env(ram_tmp) -> MemoryServiceEnv:
+    """A memory service shared by a module; call ``reset()`` before each example that writes."""
+    project_dir = Path(tempfile.mkdtemp(prefix="svc_env-", dir=ram_tmp))
+    db_path = Path(tempfile.mkdtemp(prefix="svc_env_db-", dir=ram_tmp)) / "test.db"
+    return MemoryServiceEnv(project_dir, db_path)
@@ -2,6 +2,7 @@
 
 import os
 import unittest
+from unittest import mock
 from uuid import uuid4
 
 os.environ["REMOTE_LLM_ENABLED"] = "false"
@@ -9,9 +10,11 @@ os.environ["REMOTE_EMBEDDING_ENABLED"] = "false"
 os.environ["GRAPH_FEATURE_ENABLED"] = "true"
 
 from fastapi.testclient import TestClient
-from api.main import app, get_or_create_store
+from api.main import app, chapters, get_or_create_store
 from memory import MemoryStore
-from models import CharacterProfile
+from models import Chapter, CharacterProfile
+from services.character_profile_extraction import ExtractionResult
+from services.character_profile_merge import ProfileMergeEngine
 
 
 class TestManualRebuildAPI(unittest.TestCase):
@@ -93,6 +96,69 @@ class TestManualRebuildAPI(unittest.TestCase):
     def test_rebuild_nonexistent_project_returns_404(self):
         res = self.client.post("/api/projects/nonexistent-proj/profiles/rebuild")
         self.assertEqual(res.status_code, 404)
+
+    def _add_drafted_chapter(self, pid: str) -> list[CharacterProfile]:
+        """Register a drafted chapter 1 and return the profiles its extraction should yield."""
+        chapter = Chapter(
+            id=f"ch-{uuid4().hex[:6]}",
+            project_id=pid,
+            chapter_number=1,
+            title="第一章",
+            goal="目标",
+            draft="张三与李四在城门相遇。",
+        )
+        chapters[chapter.id] = chapter
+        self.addCleanup(chapters.pop, chapter.id, None)
+        return [
+            CharacterProfile(
+                profile_id=MemoryStore.make_profile_id(pid, name),
+                project_id=pid,
+                character_name=name,
+            )
+            for name in ("张三", "李四")
+        ]
+
+    def _patch_extract(self, profiles: list[CharacterProfile]):
+        return mock.patch(
+            "services.character_profile_extraction.CharacterProfileExtractionService.extract",
+            return_value=ExtractionResult(success=True, profiles=profiles),
+        )
+
+    def test_rebuild_merge_failure_keeps_rest_of_chapter(self):
+        """A profile whose merge raises is counted as an error; its siblings are still saved."""
+        pid = self.project_id
+        profiles = self._add_drafted_chapter(pid)
+        real_merge = ProfileMergeEngine.merge
+
+        def flaky_merge(engine, existing, incoming):
+            if incoming.character_name == "张三":
+                raise ValueError("bad profile")
+            return real_merge(engine, existing=existing, incoming=incoming)
+
+        with self._patch_extract(profiles), mock.patch.object(
+            ProfileMergeEngine, "merge", flaky_merge
+        ):
+            res = self.client.post(f"/api/projects/{pid}/profiles/rebuild")
+
+        data = res.json()
+        self.assertEqual((data["processed"], data["updated"], data["errors"]), (1, 1, 1))
+        saved = {p.character_name for p in get_or_create_store(pid).list_profiles(pid)}
+        self.assertEqual(saved, {"李四"})
+
+    def test_rebuild_bulk_write_failure_counts_nothing_updated(self):
+        """If the chapter's bulk upsert raises, none of its merged profiles count as updated."""
+        pid = self.project_id
+        profiles = self._add_drafted_chapter(pid)
+
+        with self._patch_extract(profiles), mock.patch.object(
+            MemoryStore, "upsert_profiles_bulk", side_effect=RuntimeError("disk full")
+        ):
+            res = self.client.post(f"/api/projects/{pid}/profiles/rebuild")
+
+        data = res.json()
+        self.assertEqual((data["processed"], data["updated"], data["errors"]), (1, 0, 1))
+        self.assertEqual(get_or_create_store(pid).list_profiles(pid), [])
+
     def test_rebuild_respects_user_override_fields(self):
         """Fields in overridden_fields should not be overwritten by rebuild."""
         pid = self._create_project()
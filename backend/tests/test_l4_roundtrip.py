@@ -1,23 +1,21 @@
+import hashlib
 import io
-import os
-import unittest
-from typing import ClassVar, TypedDict, cast
-
-try:
-    from typing import override
-except ImportError:
-    from typing_extensions import override
-from uuid import uuid4
-
-os.environ["REMOTE_LLM_ENABLED"] = "false"
-os.environ["REMOTE_EMBEDDING_ENABLED"] = "false"
-os.environ["GRAPH_FEATURE_ENABLED"] = "true"
+from operator import attrgetter, itemgetter
+from typing import TypedDict, cast
 
+import pytest
 from fastapi.testclient import TestClient
-from api.main import app, get_or_create_store
+from api.main import build_project_graph, get_or_create_store
 from models import CharacterProfile, CharacterRelationship, OverrideSource
 from memory import MemoryStore
 
+_node_id = itemgetter("id")
+_node_label = itemgetter("label")
+_character_name = attrgetter("character_name")
+
+# Tests here share module-scoped projects; keep them on one worker under xdist.
+pytestmark = pytest.mark.xdist_group("l4_roundtrip")
+
 
 class GraphNode(TypedDict):
     id: str
@@ -29,41 +27,41 @@ class GraphResponse(TypedDict):
     edges: list[dict[str, object]]
 
 
-class TestL4RoundTrip(unittest.TestCase):
-    client: ClassVar[TestClient]
-
-    @classmethod
-    @override
-    def setUpClass(cls):
-        cls.client = TestClient(app)
-
-    def _create_project(self) -> str:
-        res = self.client.post(
-            "/api/projects",
-            json={
-                "name": f"roundtrip-{uuid4().hex[:6]}",
-                "genre": "奇幻",
-                "style": "冷峻",
-            },
-        )
-        self.assertEqual(res.status_code, 200)
-        payload = cast(dict[str, object], res.json())
-        project_id = payload["id"]
-        self.assertIsInstance(project_id, str)
-        return cast(str, project_id)
-
-    def _graph_nodes(self, project_id: str) -> list[GraphNode]:
-        graph_res = self.client.get(f"/api/projects/{project_id}/graph")
-        self.assertEqual(graph_res.status_code, 200)
-        payload = cast(GraphResponse, graph_res.json())
-        return payload["nodes"]
-
-    def _seed_profiles(self, project_id: str, count: int = 2):
-        store = get_or_create_store(project_id)
-        for i in range(count):
-            name = f"角色{i}"
-            pid = MemoryStore.make_profile_id(project_id, name)
-            profile = CharacterProfile(
+def _project_name(request: pytest.FixtureRequest) -> str:
+    """Stable per-test project name, so on-disk projects map back to the test that made them."""
+    digest = hashlib.blake2b(request.node.nodeid.encode("utf-8"), digest_size=4).hexdigest()
+    return f"roundtrip-{digest}"
+
+
+def _create_project(client: TestClient, request: pytest.FixtureRequest) -> str:
+    res = client.post(
+        "/api/projects",
+        json={
+            "name": _project_name(request),
+            "genre": "奇幻",
+            "style": "冷峻",
+        },
+    )
+    assert res.status_code == 200
+    payload = cast(dict[str, object], res.json())
+    project_id = payload["id"]
+    assert isinstance(project_id, str)
+    return project_id
+
+
+def _graph_nodes(project_id: str) -> list[GraphNode]:
+    """Build the graph in-process; the HTTP wiring is covered by the slow test below."""
+    payload = cast(GraphResponse, build_project_graph(get_or_create_store(project_id), project_id))
+    return payload["nodes"]
+
+
+def _seed_profiles(project_id: str, count: int = 2):
+    profiles = []
+    for i in range(count):
+        name = f"角色{i}"
+        pid = MemoryStore.make_profile_id(project_id, name)
+        profiles.append(
+            CharacterProfile(
                 profile_id=pid,
                 project_id=project_id,
                 character_name=name,
@@ -81,89 +79,136 @@ class TestL4RoundTrip(unittest.TestCase):
                     else []
                 ),
             )
-            store.upsert_profile(profile)
-
-    def test_full_roundtrip_l4_data_consistent(self):
-        orig_pid = self._create_project()
-        self._seed_profiles(orig_pid, count=2)
-
-        orig_nodes = self._graph_nodes(orig_pid)
-        self.assertGreater(len(orig_nodes), 0)
-
-        export_res = self.client.get(f"/api/projects/{orig_pid}/export")
-        self.assertEqual(export_res.status_code, 200)
-
-        import_res = self.client.post(
-            "/api/projects/import",
-            files={"file": ("project.zip", io.BytesIO(export_res.content), "application/zip")},
-        )
-        self.assertEqual(import_res.status_code, 200)
-        import_payload = cast(dict[str, object], import_res.json())
-        new_pid = import_payload["project_id"]
-        self.assertIsInstance(new_pid, str)
-        new_pid = cast(str, new_pid)
-
-        new_nodes = self._graph_nodes(new_pid)
-        self.assertGreater(len(new_nodes), 0)
-
-        orig_names = {n["label"] for n in orig_nodes}
-        new_names = {n["label"] for n in new_nodes}
-        self.assertEqual(orig_names, new_names, "Character names must survive round-trip")
-
-    def test_l1_l2_l3_memory_unaffected_by_l4_operations(self):
-        pid = self._create_project()
-        _ = self.client.post(
-            "/api/memory/commit",
-            json={
-                "project_id": pid,
-                "layer": "L1",
-                "content": "世界观：冰霜大陆",
-                "source_path": "memory/L1/IDENTITY.md",
-            },
         )
-        self._seed_profiles(pid, count=3)
-        _ = self.client.post(f"/api/projects/{pid}/profiles/rebuild", json={})
-        query_res = self.client.get(
-            "/api/memory/query",
-            params={
-                "project_id": pid,
-                "query": "冰霜大陆",
-            },
-        )
-        self.assertIn(query_res.status_code, [200])
-
-    def test_graph_api_handles_large_profile_set(self):
-        pid = self._create_project()
-        self._seed_profiles(pid, count=20)
-        res = self.client.get(f"/api/projects/{pid}/graph")
-        self.assertEqual(res.status_code, 200)
-        data = cast(GraphResponse, res.json())
-        self.assertEqual(len(data["nodes"]), 20)
-
-    def test_graph_node_ids_stable_across_calls(self):
-        pid = self._create_project()
-        self._seed_profiles(pid, count=3)
-        ids1 = {n["id"] for n in self._graph_nodes(pid)}
-        ids2 = {n["id"] for n in self._graph_nodes(pid)}
-        self.assertEqual(ids1, ids2, "Node IDs must be stable (deterministic)")
-
-    def test_l4_rebuild_preserves_user_override(self):
-        pid = self._create_project()
-        store = get_or_create_store(pid)
-        profile_id = MemoryStore.make_profile_id(pid, "张三")
-        profile = CharacterProfile(
-            profile_id=profile_id,
-            project_id=pid,
-            character_name="张三",
-            personality="用户设定的性格",
-            override_source=OverrideSource.USER_OVERRIDE,
-        )
-        store.upsert_profile(profile)
-        _ = self.client.post(f"/api/projects/{pid}/profiles/rebuild", json={})
-        updated = store.get_profile(profile_id)
-        if updated:
-            self.assertEqual(
-                updated.personality,
-                "用户设定的性格",
-                "User override must survive rebuild",
-            )
+    get_or_create_store(project_id).upsert_profiles_bulk(profiles)
+
+
+@pytest.fixture(scope="module")
+def seeded_project(client: TestClient, request: pytest.FixtureRequest) -> str:
+    """A project with three seeded profiles, shared by the read-only graph tests."""
+    pid = _create_project(client, request)
+    _seed_profiles(pid, count=3)
+    return pid
+
+
+def test_l4_profiles_survive_dict_export_import(client: TestClient, request: pytest.FixtureRequest):
+    orig_pid = _create_project(client, request)
+    _seed_profiles(orig_pid, count=2)
+    orig_store = get_or_create_store(orig_pid)
+    payload = orig_store.export_dict(orig_pid)
+
+    new_pid = _create_project(client, request)
+    new_store = get_or_create_store(new_pid)
+    assert new_store.import_dict(new_pid, payload) == 2
+
+    orig_profiles = orig_store.list_profiles(orig_pid)
+    new_profiles = new_store.list_profiles(new_pid)
+    assert set(map(_character_name, new_profiles)) == set(map(_character_name, orig_profiles))
+    assert {p.profile_id for p in new_profiles} == {
+        MemoryStore.make_profile_id(new_pid, p.character_name) for p in orig_profiles
+    }
+    assert [p.relationships for p in new_profiles] == [p.relationships for p in orig_profiles]
+
+
+@pytest.mark.slow
+def test_full_roundtrip_l4_data_consistent(client: TestClient, request: pytest.FixtureRequest):
+    orig_pid = _create_project(client, request)
+    _seed_profiles(orig_pid, count=2)
+
+    orig_nodes = _graph_nodes(orig_pid)
+    assert len(orig_nodes) > 0
+
+    export_res = client.get(f"/api/projects/{orig_pid}/export")
+    assert export_res.status_code == 200
+
+    import_res = client.post(
+        "/api/projects/import",
+        files={"file": ("project.zip", io.BytesIO(export_res.content), "application/zip")},
+    )
+    assert import_res.status_code == 200
+    import_payload = cast(dict[str, object], import_res.json())
+    new_pid = import_payload["project_id"]
+    assert isinstance(new_pid, str)
+
+    new_nodes = _graph_nodes(new_pid)
+    assert len(new_nodes) > 0
+
+    orig_names = set(map(_node_label, orig_nodes))
+    new_names = set(map(_node_label, new_nodes))
+    assert orig_names == new_names, "Character names must survive round-trip"
+
+
+def test_l1_l2_l3_memory_unaffected_by_l4_operations(
+    client: TestClient, request: pytest.FixtureRequest
+):
+    # Commits memory and rebuilds profiles, so it must not touch seeded_project.
+    pid = _create_project(client, request)
+    _seed_profiles(pid, count=3)
+    _ = client.post(
+        "/api/memory/commit",
+        json={
+            "project_id": pid,
+            "layer": "L1",
+            "content": "世界观：冰霜大陆",
+            "source_path": "memory/L1/IDENTITY.md",
+        },
+    )
+    _ = client.post(f"/api/projects/{pid}/profiles/rebuild", json={})
+    query_res = client.get(
+        "/api/memory/query",
+        params={
+            "project_id": pid,
+            "query": "冰霜大陆",
+        },
+    )
+    assert query_res.status_code in [200]
+
+
+def test_seeded_profile_count_matches(client: TestClient, request: pytest.FixtureRequest):
+    pid = _create_project(client, request)
+    _seed_profiles(pid, count=20)
+    assert get_or_create_store(pid).count_profiles(pid) == 20
+
+
+@pytest.mark.slow
+def test_graph_api_handles_large_profile_set(client: TestClient, request: pytest.FixtureRequest):
+    pid = _create_project(client, request)
+    _seed_profiles(pid, count=20)
+    res = client.get(f"/api/projects/{pid}/graph")
+    assert res.status_code == 200
+    data = cast(GraphResponse, res.json())
+    assert len(data["nodes"]) == 20
+
+
+def test_graph_soa_format_matches_default(client: TestClient, seeded_project: str):
+    aos = cast(GraphResponse, client.get(f"/api/projects/{seeded_project}/graph").json())
+    res = client.get(f"/api/projects/{seeded_project}/graph", params={"format": "soa"})
+    assert res.status_code == 200
+    soa = res.json()
+    assert soa["node_ids"] == list(map(_node_id, aos["nodes"]))
+    assert soa["node_labels"] == list(map(_node_label, aos["nodes"]))
+    assert soa["edges"] == aos["edges"]
+
+
+def test_graph_node_ids_stable_across_calls(client: TestClient, seeded_project: str):
+    ids1 = set(map(_node_id, _graph_nodes(seeded_project)))
+    ids2 = set(map(_node_id, _graph_nodes(seeded_project)))
+    assert ids1 == ids2, "Node IDs must be stable (deterministic)"
+
+
+def test_l4_rebuild_preserves_user_override(client: TestClient, request: pytest.FixtureRequest):
+    pid = _create_project(client, request)
+    store = get_or_create_store(pid)
+    profile_id = MemoryStore.make_profile_id(pid, "张三")
+    profile = CharacterProfile(
+        profile_id=profile_id,
+        project_id=pid,
+        character_name="张三",
+        personality="用户设定的性格",
+        override_source=OverrideSource.USER_OVERRIDE,
+    )
+    store.upsert_profile(profile)
+    _ = client.post(f"/api/projects/{pid}/profiles/rebuild", json={})
+    updated = store.get_profile(profile_id)
+    if updated:
+        assert updated.personality == "用户设定的性格", "User override must survive rebuild"
@@ -1,9 +1,8 @@
 """Tests for L4 character profile store primitives (TDD - Task 2)."""
 
 import os
-import tempfile
-import unittest
-from pathlib import Path
+
+import pytest
 
 os.environ["REMOTE_LLM_ENABLED"] = "false"
 os.environ["REMOTE_EMBEDDING_ENABLED"] = "false"
@@ -18,9 +17,21 @@ from models import (
 )
 
 
-def _make_store() -> MemoryStore:
-    tmp = tempfile.mkdtemp()
-    return MemoryStore(project_path=tmp, db_path=str(Path(tmp) / "test.db"))
+@pytest.fixture(scope="module")
+def _shared_store(tmp_path_factory) -> MemoryStore:
+    """One MemoryStore (and one schema migration) for the whole module."""
+    tmp = tmp_path_factory.mktemp("l4store")
+    return MemoryStore(project_path=str(tmp), db_path=str(tmp / "test.db"))
+
+
+@pytest.fixture
+def store(_shared_store):
+    """Hand out the shared store and wipe the rows each test wrote."""
+    yield _shared_store
+    with _shared_store._connection() as conn:
+        conn.execute("DELETE FROM character_profiles")
+        conn.execute("DELETE FROM entities")
+        conn.commit()
 
 
 def _make_profile(project_id="proj1", name="张三", **kwargs) -> CharacterProfile:
@@ -33,131 +44,159 @@ def _make_profile(project_id="proj1", name="张三", **kwargs) -> CharacterProfi
     )
 
 
-class TestProfileId(unittest.TestCase):
-    def test_deterministic(self):
-        a = MemoryStore.make_profile_id("proj1", "张三")
-        b = MemoryStore.make_profile_id("proj1", "张三")
-        self.assertEqual(a, b)
-
-    def test_different_names(self):
-        a = MemoryStore.make_profile_id("proj1", "张三")
-        b = MemoryStore.make_profile_id("proj1", "李四")
-        self.assertNotEqual(a, b)
-
-    def test_different_projects(self):
-        a = MemoryStore.make_profile_id("proj1", "张三")
-        b = MemoryStore.make_profile_id("proj2", "张三")
-        self.assertNotEqual(a, b)
-
-
-class TestProfileCRUD(unittest.TestCase):
-    def setUp(self):
-        self.store = _make_store()
-
-    def test_upsert_and_get(self):
-        profile = _make_profile(overview="主角", personality="坚毅")
-        self.store.upsert_profile(profile)
-        fetched = self.store.get_profile(profile.profile_id)
-        self.assertIsNotNone(fetched)
-        self.assertEqual(fetched.character_name, "张三")
-        self.assertEqual(fetched.overview, "主角")
-        self.assertEqual(fetched.personality, "坚毅")
-
-    def test_upsert_updates_existing(self):
-        profile = _make_profile(overview="初始")
-        self.store.upsert_profile(profile)
-        profile.overview = "更新后"
-        self.store.upsert_profile(profile)
-        fetched = self.store.get_profile(profile.profile_id)
-        self.assertEqual(fetched.overview, "更新后")
-
-    def test_upsert_same_id_no_duplicate(self):
-        profile = _make_profile()
-        self.store.upsert_profile(profile)
-        self.store.upsert_profile(profile)
-        profiles = self.store.list_profiles("proj1")
-        self.assertEqual(len(profiles), 1)
-
-    def test_get_nonexistent_returns_none(self):
-        result = self.store.get_profile("nonexistent-id")
-        self.assertIsNone(result)
-
-    def test_list_profiles_by_project(self):
-        p1 = _make_profile("proj1", "张三")
-        p2 = _make_profile("proj1", "李四")
-        p3 = _make_profile("proj2", "王五")
-        for p in [p1, p2, p3]:
-            self.store.upsert_profile(p)
-        results = self.store.list_profiles("proj1")
-        self.assertEqual(len(results), 2)
-        names = {r.character_name for r in results}
-        self.assertIn("张三", names)
-        self.assertIn("李四", names)
-
-    def test_list_profiles_empty_project(self):
-        results = self.store.list_profiles("no-such-project")
-        self.assertEqual(results, [])
-
-    def test_nested_relationships_roundtrip(self):
-        profile = _make_profile(
-            relationships=[
-                CharacterRelationship(
-                    source_character="张三",
-                    target_character="李四",
-                    relation_type="师徒",
-                    chapter=1,
-                )
-            ]
-        )
-        self.store.upsert_profile(profile)
-        fetched = self.store.get_profile(profile.profile_id)
-        self.assertEqual(len(fetched.relationships), 1)
-        self.assertEqual(fetched.relationships[0].relation_type, "师徒")
-
-    def test_nested_state_changes_roundtrip(self):
-        profile = _make_profile(
-            state_changes=[
-                CharacterStateChange(
-                    character="张三", attribute="实力", to_value="金丹期", chapter=3
-                )
-            ]
-        )
-        self.store.upsert_profile(profile)
-        fetched = self.store.get_profile(profile.profile_id)
-        self.assertEqual(len(fetched.state_changes), 1)
-        self.assertEqual(fetched.state_changes[0].to_value, "金丹期")
-
-    def test_nested_chapter_events_roundtrip(self):
-        profile = _make_profile(
-            chapter_events=[ChapterEvent(character="张三", chapter=2, event_summary="初次登场")]
-        )
-        self.store.upsert_profile(profile)
-        fetched = self.store.get_profile(profile.profile_id)
-        self.assertEqual(len(fetched.chapter_events), 1)
-        self.assertEqual(fetched.chapter_events[0].event_summary, "初次登场")
-
-    def test_override_source_preserved(self):
-        profile = _make_profile(override_source=OverrideSource.USER_OVERRIDE)
-        self.store.upsert_profile(profile)
-        fetched = self.store.get_profile(profile.profile_id)
-        self.assertEqual(fetched.override_source, OverrideSource.USER_OVERRIDE)
-
-    def test_delete_profile(self):
-        profile = _make_profile()
-        self.store.upsert_profile(profile)
-        self.store.delete_profile(profile.profile_id)
-        self.assertIsNone(self.store.get_profile(profile.profile_id))
-
-    def test_existing_tables_unaffected(self):
-        """Ensure L1/L2/L3 tables still work after L4 migration."""
-        from models import EntityState
-
-        entity = EntityState(entity_id="e1", entity_type="character", name="测试角色")
-        self.store.add_entity(entity)
-        fetched = self.store.get_entity("e1")
-        self.assertIsNotNone(fetched)
-        self.assertEqual(fetched.name, "测试角色")
-
-
-if __name__ == "__main__":
-    unittest.main()
+def test_profile_id_deterministic():
+    a = MemoryStore.make_profile_id("proj1", "张三")
+    b = MemoryStore.make_profile_id("proj1", "张三")
+    assert a == b
+
+
+def test_profile_id_different_names():
+    a = MemoryStore.make_profile_id("proj1", "张三")
+    b = MemoryStore.make_profile_id("proj1", "李四")
+    assert a != b
+
+
+def test_profile_id_different_projects():
+    a = MemoryStore.make_profile_id("proj1", "张三")
+    b = MemoryStore.make_profile_id("proj2", "张三")
+    assert a != b
+
+
+def test_profile_id_memoized():
+    a = MemoryStore.make_profile_id("proj1", "张三")
+    b = MemoryStore.make_profile_id("proj1", "张三")
+    assert a is b
+
+
+def test_upsert_and_get(store):
+    profile = _make_profile(overview="主角", personality="坚毅")
+    store.upsert_profile(profile)
+    fetched = store.get_profile(profile.profile_id)
+    assert fetched is not None
+    assert fetched.character_name == "张三"
+    assert fetched.overview == "主角"
+    assert fetched.personality == "坚毅"
+
+
+def test_upsert_updates_existing(store):
+    profile = _make_profile(overview="初始")
+    store.upsert_profile(profile)
+    profile.overview = "更新后"
+    store.upsert_profile(profile)
+    fetched = store.get_profile(profile.profile_id)
+    assert fetched.overview == "更新后"
+
+
+def test_upsert_same_id_no_duplicate(store):
+    profile = _make_profile()
+    store.upsert_profiles_bulk([profile, profile])
+    assert store.count_profiles("proj1") == 1
+
+
+def test_upsert_profiles_bulk_inserts_and_replaces(store):
+    p1 = _make_profile("proj1", "张三", overview="初始")
+    p2 = _make_profile("proj1", "李四")
+    store.upsert_profiles_bulk([p1, p2])
+    p1.overview = "更新后"
+    store.upsert_profiles_bulk([p1])
+    results = store.list_profiles("proj1")
+    assert {r.character_name for r in results} == {"张三", "李四"}
+    assert store.get_profile(p1.profile_id).overview == "更新后"
+
+
+def test_get_nonexistent_returns_none(store):
+    result = store.get_profile("nonexistent-id")
+    assert result is None
+
+
+def test_list_profiles_by_project(store):
+    p1 = _make_profile("proj1", "张三")
+    p2 = _make_profile("proj1", "李四")
+    p3 = _make_profile("proj2", "王五")
+    store.upsert_profiles_bulk([p1, p2, p3])
+    results = store.list_profiles("proj1")
+    assert len(results) == 2
+    names = {r.character_name for r in results}
+    assert "张三" in names
+    assert "李四" in names
+    assert store.count_profiles("proj2") == 1
+
+
+def test_list_profiles_empty_project(store):
+    results = store.list_profiles("no-such-project")
+    assert results == []
+
+
+@pytest.mark.parametrize(
+    ("fields", "check"),
+    [
+        pytest.param(
+            {
+                "relationships": [
+                    CharacterRelationship(
+                        source_character="张三",
+                        target_character="李四",
+                        relation_type="师徒",
+                        chapter=1,
+                    )
+                ]
+            },
+            lambda p: len(p.relationships) == 1 and p.relationships[0].relation_type == "师徒",
+            id="relationships",
+        ),
+        pytest.param(
+            {
+                "state_changes": [
+                    CharacterStateChange(
+                        character="张三", attribute="实力", to_value="金丹期", chapter=3
+                    )
+                ]
+            },
+            lambda p: len(p.state_changes) == 1 and p.state_changes[0].to_value == "金丹期",
+            id="state_changes",
+        ),
+        pytest.param(
+            {"chapter_events": [ChapterEvent(character="张三", chapter=2, event_summary="初次登场")]},
+            lambda p: len(p.chapter_events) == 1
+            and p.chapter_events[0].event_summary == "初次登场",
+            id="chapter_events",
+        ),
+        pytest.param(
+            {"override_source": OverrideSource.USER_OVERRIDE},
+            lambda p: p.override_source == OverrideSource.USER_OVERRIDE,
+            id="override_source",
+        ),
+    ],
+)
+def test_profile_fields_roundtrip(store, fields, check):
+    profile = _make_profile(**fields)
+    store.upsert_profile(profile)
+    fetched = store.get_profile(profile.profile_id)
+    assert fetched is not None
+    assert check(fetched)
+
+
+def test_delete_profile(store):
+    profile = _make_profile()
+    store.upsert_profile(profile)
+    store.delete_profile(profile.profile_id)
+    assert store.get_profile(profile.profile_id) is None
+
+
+def test_connection_uses_wal_and_normal_sync(store):
+    """Every store connection runs in WAL mode with synchronous=NORMAL (1)."""
+    with store._connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+
+def test_existing_tables_unaffected(store):
+    """Ensure L1/L2/L3 tables still work after L4 migration."""
+    from models import EntityState
+
+    entity = EntityState(entity_id="e1", entity_type="character", name="测试角色")
+    store.add_entity(entity)
+    fetched = store.get_entity("e1")
+    assert fetched is not None
+    assert fetched.name == "测试角色"
+
@@ -4,7 +4,10 @@ Property-based tests for Memory Context Injection feature.
 Uses hypothesis to verify invariants across randomized inputs.
 """
 
+import json
+import string
 import sys
+import tempfile
 from pathlib import Path
 
 # Ensure backend root is on sys.path so bare imports work (e.g. `from utils.text_cleaner import ...`)
@@ -12,10 +15,11 @@ _backend_root = str(Path(__file__).resolve().parent.parent)
 if _backend_root not in sys.path:
     sys.path.insert(0, _backend_root)
 
-import string
-
-from hypothesis import given, settings, strategies as st
+import pytest
+from hypothesis import given, settings, strategies as st, target
+from hypothesis.stateful import RuleBasedStateMachine, rule, run_state_machine_as_test
 
+from memory import ThreeLayerMemory
 from utils.text_cleaner import (
     DEFAULT_BLOCKLIST,
     KEYWORD_STOPWORDS,
@@ -24,6 +28,7 @@ from utils.text_cleaner import (
     clean_foreshadowing_text,
     extract_keywords,
     is_pseudo_field_line,
+    iter_keywords,
 )
 
 # ---------------------------------------------------------------------------
@@ -31,20 +36,29 @@ from utils.text_cleaner import (
 # ---------------------------------------------------------------------------
 settings.register_profile("ci", max_examples=200)
 settings.register_profile("dev", max_examples=100)
+# Examples that touch the filesystem and SQLite; the invariants they check are structural.
+settings.register_profile("ci_fast", max_examples=25, deadline=None, database=None)
+_IO_BOUND = settings.get_profile("ci_fast")
 
 # ---------------------------------------------------------------------------
 # Strategies
 # ---------------------------------------------------------------------------
 
+_BLOCKLIST_TUPLE = tuple(sorted(DEFAULT_BLOCKLIST))
+_STOPWORD_TUPLE = tuple(sorted(KEYWORD_STOPWORDS))
+# Common CJK subset; the strategies below sample prefixes of it.
+_CJK_500 = tuple(map(chr, range(0x4E00, 0x4E00 + 500)))
+_FS_ALPHABET = _CJK_500[:200] + tuple("abcdefghij")
+
 # Strategy: a single blocklist word
-_blocklist_word = st.sampled_from(sorted(DEFAULT_BLOCKLIST))
+_blocklist_word = st.sampled_from(_BLOCKLIST_TUPLE)
 
 # Strategy: a normal (non-blocklist) word — short latin or CJK-ish token
 _normal_word = st.text(
     alphabet=st.sampled_from(list(string.ascii_lowercase)),
     min_size=3,
     max_size=8,
-).filter(lambda w: w.lower() not in DEFAULT_BLOCKLIST)
+).filter(lambda w: w not in DEFAULT_BLOCKLIST)  # alphabet is already lowercase
 
 # Strategy: a line that mixes normal words and blocklist words
 _mixed_line = st.lists(
@@ -56,6 +70,18 @@ _mixed_line = st.lists(
 # Strategy: multi-line text built from mixed lines
 _mixed_text = st.lists(_mixed_line, min_size=1, max_size=10).map(lambda lines: "\n".join(lines))
 
+# Strategy: blueprint-style line -- blocklist words (any case), near-misses, digits,
+# CJK and punctuation glued together with or without separators
+_boilerplate_line = st.lists(
+    st.one_of(
+        _blocklist_word.map(str.upper),
+        _blocklist_word,
+        _blocklist_word.map(lambda w: w + "s"),
+        st.sampled_from(("-", "*", ":", ", ", " ", "1.", "主", "ſ", "\t")),
+    ),
+    max_size=8,
+).map("".join)
+
 
 # ---------------------------------------------------------------------------
 # Property 9: Text cleaner filters blocklisted tokens and pseudo-field lines
@@ -76,15 +102,18 @@ class TestProperty9TextCleanerFiltersBlocklisted:
         any non-blank line where blocklisted tokens exceed 50% of total tokens.
         """
         cleaned = clean_foreshadowing_text(text)
+        findall = _TOKEN_RE.findall
+        blocklist = DEFAULT_BLOCKLIST
         for line in cleaned.splitlines():
             stripped = line.strip()
             if not stripped:
                 continue
-            tokens = _TOKEN_RE.findall(stripped)
-            if not tokens:
+            tokens = findall(stripped)
+            n = len(tokens)
+            if not n:
                 continue
-            blocked = sum(1 for t in tokens if t.lower() in DEFAULT_BLOCKLIST)
-            assert blocked / len(tokens) <= 0.5, (
+            blocked = sum(1 for t in tokens if t.lower() in blocklist)
+            assert blocked * 2 <= n, (
                 f"Line still has >50% blocklist tokens after cleaning: {stripped!r}"
             )
 
@@ -106,16 +135,25 @@ class TestProperty9TextCleanerFiltersBlocklisted:
                 f"Kept line is classified as pseudo-field: {stripped!r}"
             )
 
+    @given(line=_boilerplate_line)
+    @settings(max_examples=1000)
+    def test_default_fast_paths_match_tokenizer(self, line: str) -> None:
+        """
+        **Validates: Requirements 7.1, 7.2**
+
+        The default-blocklist shortcuts (whole-line regex, ASCII byte table)
+        classify every line exactly as the generic tokenizer path does.
+        """
+        assert is_pseudo_field_line(line) is is_pseudo_field_line(line, set(DEFAULT_BLOCKLIST))
+
 
 # ---------------------------------------------------------------------------
 # Strategies for Property 10
 # ---------------------------------------------------------------------------
 
 # Strategy: text mixing CJK characters, latin words, stopwords, and short tokens
-_cjk_chars = st.sampled_from(
-    [chr(c) for c in range(0x4E00, 0x4E00 + 200)]  # common CJK subset
-)
-_stopword = st.sampled_from(sorted(KEYWORD_STOPWORDS))
+_cjk_chars = st.sampled_from(_CJK_500[:200])
+_stopword = st.sampled_from(_STOPWORD_TUPLE)
 
 _keyword_text = st.lists(
     st.one_of(
@@ -181,24 +219,39 @@ class TestProperty10KeywordExtractionConstraints:
         keywords = extract_keywords(text)
         assert len(keywords) == len(set(keywords)), "Duplicate keywords found"
 
+    @given(text=_keyword_text, max_keywords=st.integers(min_value=0, max_value=5))
+    @settings(max_examples=100)
+    def test_max_keywords_returns_prefix(self, text: str, max_keywords: int) -> None:
+        """
+        **Validates: Requirements 7.3**
+
+        A capped extraction is the leading slice of the full keyword list.
+        """
+        keywords = extract_keywords(text)
+        assert extract_keywords(text, max_keywords=max_keywords) == keywords[:max_keywords]
+        assert list(iter_keywords(text)) == keywords
+
 
 # ---------------------------------------------------------------------------
 # Property 11: Auto-migration creates missing files idempotently
 # **Validates: Requirements 9.1**
 # ---------------------------------------------------------------------------
 
-import shutil
-import tempfile
 
-from memory import ThreeLayerMemory
+@pytest.fixture(scope="class")
+def clean_tmp(ram_tmp) -> str:
+    """One project dir for Property 11; examples remove only the files under test."""
+    return tempfile.mkdtemp(prefix="auto_migration-", dir=ram_tmp)
 
 
 class TestProperty11AutoMigrationIdempotent:
     """Property 11: Auto-migration creates missing files idempotently."""
 
     @given(call_count=st.integers(min_value=1, max_value=5))
-    @settings(max_examples=50)
-    def test_ensure_directories_creates_files_idempotently(self, call_count: int) -> None:
+    @settings(parent=_IO_BOUND)
+    def test_ensure_directories_creates_files_idempotently(
+        self, clean_tmp: str, call_count: int
+    ) -> None:
         """
         **Validates: Requirements 9.1**
 
@@ -206,78 +259,72 @@ class TestProperty11AutoMigrationIdempotent:
         should always result in RUNTIME_STATE.md and OPEN_THREADS.md existing
         with valid structural headers.
         """
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            for _ in range(call_count):
-                tlm = ThreeLayerMemory(tmp_dir)
-
-            # After all calls, files must exist
-            runtime_state = tlm.l1_dir / "RUNTIME_STATE.md"
-            open_threads = tlm.memory_dir / "OPEN_THREADS.md"
-
-            assert runtime_state.exists(), "RUNTIME_STATE.md should exist"
-            assert open_threads.exists(), "OPEN_THREADS.md should exist"
-
-            # Validate structural headers
-            rs_content = runtime_state.read_text(encoding="utf-8")
-            assert rs_content.startswith("# RUNTIME_STATE"), (
-                "RUNTIME_STATE.md should start with '# RUNTIME_STATE'"
-            )
-            assert "## New Characters" in rs_content
-            assert "## Character State Changes" in rs_content
-            assert "## Recent Mainline Status" in rs_content
+        tlm = ThreeLayerMemory(clean_tmp)
+        runtime_state = tlm.l1_dir / "RUNTIME_STATE.md"
+        open_threads = tlm.memory_dir / "OPEN_THREADS.md"
+        # Start each example as if migrating a project that predates these files.
+        for path in (runtime_state, open_threads):
+            path.unlink(missing_ok=True)
+
+        for _ in range(call_count):
+            ThreeLayerMemory(clean_tmp)
+
+        # After all calls, files must exist
+        assert runtime_state.exists(), "RUNTIME_STATE.md should exist"
+        assert open_threads.exists(), "OPEN_THREADS.md should exist"
+
+        # Validate structural headers
+        rs_content = runtime_state.read_text(encoding="utf-8")
+        assert rs_content.startswith("# RUNTIME_STATE"), (
+            "RUNTIME_STATE.md should start with '# RUNTIME_STATE'"
+        )
+        assert "## New Characters" in rs_content
+        assert "## Character State Changes" in rs_content
+        assert "## Recent Mainline Status" in rs_content
 
-            ot_content = open_threads.read_text(encoding="utf-8")
-            assert ot_content.startswith("# OPEN_THREADS"), (
-                "OPEN_THREADS.md should start with '# OPEN_THREADS'"
-            )
-            assert "## Open" in ot_content
-            assert "## Resolved" in ot_content
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-
-    @given(data=st.data())
-    @settings(max_examples=30)
-    def test_existing_files_not_overwritten(self, data: st.DataObject) -> None:
+        ot_content = open_threads.read_text(encoding="utf-8")
+        assert ot_content.startswith("# OPEN_THREADS"), (
+            "OPEN_THREADS.md should start with '# OPEN_THREADS'"
+        )
+        assert "## Open" in ot_content
+        assert "## Resolved" in ot_content
+
+    @given(repeat=st.integers(min_value=1, max_value=3))
+    @settings(parent=_IO_BOUND)
+    def test_existing_files_not_overwritten(self, ram_tmp, repeat: int) -> None:
         """
         **Validates: Requirements 9.1**
 
         If RUNTIME_STATE.md and OPEN_THREADS.md already exist, subsequent
         ThreeLayerMemory initializations should NOT overwrite them.
         """
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            # First init creates files
-            tlm = ThreeLayerMemory(tmp_dir)
+        # Fresh dir per example; the session fixture removes them all at once.
+        tmp_dir = tempfile.mkdtemp(dir=ram_tmp)
+        # First init creates files
+        tlm = ThreeLayerMemory(tmp_dir)
 
-            runtime_state = tlm.l1_dir / "RUNTIME_STATE.md"
-            open_threads = tlm.memory_dir / "OPEN_THREADS.md"
+        runtime_state = tlm.l1_dir / "RUNTIME_STATE.md"
+        open_threads = tlm.memory_dir / "OPEN_THREADS.md"
 
-            # Record original content
-            rs_original = runtime_state.read_text(encoding="utf-8")
-            ot_original = open_threads.read_text(encoding="utf-8")
+        # Record original content
+        rs_original = runtime_state.read_text(encoding="utf-8")
+        ot_original = open_threads.read_text(encoding="utf-8")
 
-            # Re-init multiple times
-            repeat = data.draw(st.integers(min_value=1, max_value=3))
-            for _ in range(repeat):
-                ThreeLayerMemory(tmp_dir)
+        # Re-init multiple times
+        for _ in range(repeat):
+            ThreeLayerMemory(tmp_dir)
 
-            # Content should be unchanged (idempotent — no overwrite)
-            assert runtime_state.read_text(encoding="utf-8") == rs_original
-            assert open_threads.read_text(encoding="utf-8") == ot_original
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Content should be unchanged (idempotent — no overwrite)
+        assert runtime_state.read_text(encoding="utf-8") == rs_original
+        assert open_threads.read_text(encoding="utf-8") == ot_original
 
 
 # ---------------------------------------------------------------------------
-# Imports for Property 7, 3, 4 (MemoryContextService tests)
+# Strategies for Property 7
 # ---------------------------------------------------------------------------
 
-from memory import MemoryStore
-from services.memory_context import MemoryContextService
-
 # Strategy for Chinese text
-_chinese_chars = st.sampled_from([chr(c) for c in range(0x4E00, 0x4E00 + 500)])
+_chinese_chars = st.sampled_from(_CJK_500)
 _chinese_text = st.lists(_chinese_chars, min_size=50, max_size=500).map(lambda cs: "".join(cs))
 
 # Strategy for optional plan dict
@@ -306,20 +353,14 @@ class TestProperty7ChapterSynopsisLengthBound:
         chapter_plan=_optional_plan,
         chapter_number=st.integers(min_value=1, max_value=30),
     )
-    @settings(max_examples=100)
-    def test_synopsis_length_and_non_empty(self, chapter_text, chapter_plan, chapter_number):
+    @settings(parent=_IO_BOUND)
+    def test_synopsis_length_and_non_empty(
+        self, svc_env, chapter_text, chapter_plan, chapter_number
+    ):
         """Validates: Requirements 4.1, 4.2, 4.3"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            synopsis = svc.generate_chapter_synopsis(chapter_number, chapter_text, chapter_plan)
-            assert synopsis, "Synopsis must be non-empty"
-            assert len(synopsis) <= 300, f"Synopsis too long: {len(synopsis)} chars"
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        synopsis = svc_env.svc.generate_chapter_synopsis(chapter_number, chapter_text, chapter_plan)
+        assert synopsis, "Synopsis must be non-empty"
+        assert len(synopsis) <= 300, f"Synopsis too long: {len(synopsis)} chars"
 
 
 # ---------------------------------------------------------------------------
@@ -328,7 +369,7 @@ class TestProperty7ChapterSynopsisLengthBound:
 
 # Strategy for chapter plans with foreshadowing
 _foreshadowing_text = st.text(
-    alphabet=st.sampled_from([chr(c) for c in range(0x4E00, 0x4E00 + 200)] + list("abcdefghij")),
+    alphabet=st.sampled_from(_FS_ALPHABET),
     min_size=5,
     max_size=50,
 )
@@ -353,6 +394,8 @@ _project_chapters = st.lists(
     ),
     min_size=1,
     max_size=8,
+    # A project never has two chapters with the same number.
+    unique_by=lambda c: c["chapter_number"],
 ).map(lambda chs: sorted(chs, key=lambda c: c["chapter_number"]))
 
 
@@ -366,30 +409,24 @@ class TestProperty3OpenThreadRecomputeValid:
     """Property 3: Open thread recompute produces valid, complete entries."""
 
     @given(chapters=_project_chapters)
-    @settings(max_examples=100)
-    def test_all_threads_have_required_fields(self, chapters):
+    @settings(parent=_IO_BOUND)
+    def test_all_threads_have_required_fields(self, svc_env, chapters):
         """Validates: Requirements 2.2, 2.5"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            threads = svc.recompute_open_threads(chapters)
-            required_fields = {
-                "source_chapter",
-                "text",
-                "status",
-                "resolved_by_chapter",
-                "evidence",
-            }
-            for t in threads:
-                assert required_fields.issubset(t.keys()), f"Missing fields in thread: {t.keys()}"
-                assert t["status"] in ("open", "resolved"), f"Invalid status: {t['status']}"
-                if t["status"] == "resolved":
-                    assert t["resolved_by_chapter"] is not None
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        svc_env.reset()
+        svc = svc_env.svc
+        threads = svc.recompute_open_threads(chapters)
+        required_fields = {
+            "source_chapter",
+            "text",
+            "status",
+            "resolved_by_chapter",
+            "evidence",
+        }
+        for t in threads:
+            assert required_fields.issubset(t.keys()), f"Missing fields in thread: {t.keys()}"
+            assert t["status"] in ("open", "resolved"), f"Invalid status: {t['status']}"
+            if t["status"] == "resolved":
+                assert t["resolved_by_chapter"] is not None
 
 
 # ---------------------------------------------------------------------------
@@ -397,22 +434,18 @@ class TestProperty3OpenThreadRecomputeValid:
 # **Validates: Requirements 2.3, 2.4**
 # ---------------------------------------------------------------------------
 
+# Built once at import rather than inside the test body on every example.
+_callback_fs_text = st.text(alphabet=st.sampled_from(_CJK_500[:100]), min_size=5, max_size=30)
+
 
 class TestProperty4ThreadResolutionPriority:
     """Property 4: Thread resolution with callback_targets priority and keyword fallback."""
 
-    @given(data=st.data())
-    @settings(max_examples=50)
-    def test_callback_targets_take_priority(self, data):
+    @given(fs_text=_callback_fs_text)
+    @settings(parent=_IO_BOUND)
+    def test_callback_targets_take_priority(self, svc_env, fs_text):
         """Validates: Requirements 2.3, 2.4"""
         # Create a scenario where both callback_targets and keyword match exist
-        fs_text = data.draw(
-            st.text(
-                alphabet=st.sampled_from([chr(c) for c in range(0x4E00, 0x4E00 + 100)]),
-                min_size=5,
-                max_size=30,
-            )
-        )
 
         chapters = [
             {
@@ -439,111 +472,77 @@ class TestProperty4ThreadResolutionPriority:
             },
         ]
 
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            threads = svc.recompute_open_threads(chapters)
+        svc_env.reset()
+        svc = svc_env.svc
+        threads = svc.recompute_open_threads(chapters)
 
-            resolved = [t for t in threads if t["status"] == "resolved"]
-            for t in resolved:
-                if t["source_chapter"] == 1:
-                    # Should be resolved by callback_target, not keyword
-                    assert "callback_target" in t["evidence"], (
-                        f"Expected callback_target evidence, got: {t['evidence']}"
-                    )
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        resolved = [t for t in threads if t["status"] == "resolved"]
+        for t in resolved:
+            if t["source_chapter"] == 1:
+                # Should be resolved by callback_target, not keyword
+                assert "callback_target" in t["evidence"], (
+                    f"Expected callback_target evidence, got: {t['evidence']}"
+                )
 
 
 # ---------------------------------------------------------------------------
-# Property 8: Context_Pack structural completeness and budget invariant
-# **Validates: Requirements 5.1, 5.2**
+# Property 5 + 8: Context_Pack structure, budget invariant and top-k limit
+# **Validates: Requirements 2.6, 5.1, 5.2**
 # ---------------------------------------------------------------------------
 
 
-class TestProperty8ContextPackStructuralCompleteness:
-    """Property 8: Context_Pack structural completeness and budget invariant."""
-
-    @given(
-        chapter_number=st.integers(min_value=1, max_value=20),
-        chapters=_project_chapters,
-    )
-    @settings(max_examples=100)
-    def test_context_pack_has_all_keys_and_budget_invariant(self, chapter_number, chapters):
-        """Validates: Requirements 5.1, 5.2"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            pack = svc.build_generation_context_pack(chapter_number, chapters)
-
-            # All 7 required keys
-            required_keys = {
-                "identity_core",
-                "runtime_state",
-                "memory_compact",
-                "previous_chapter_synopsis",
-                "open_threads",
-                "previous_chapters_compact",
-                "budget_stats",
-            }
-            assert required_keys.issubset(pack.keys()), (
-                f"Missing keys: {required_keys - pack.keys()}"
-            )
+class TestProperty5And8ContextPackInvariants:
+    """Properties 5 and 8, checked against a single context pack per example.
 
-            # Budget invariant: sum of *_used <= total_budget
-            bs = pack["budget_stats"]
-            used_fields = [
-                bs["identity_core_used"],
-                bs["runtime_state_used"],
-                bs["memory_compact_used"],
-                bs["previous_synopsis_used"],
-                bs["open_threads_used"],
-                bs["previous_chapters_used"],
-            ]
-            total_used = sum(used_fields)
-            assert total_used <= bs["total_budget"], (
-                f"Total used {total_used} exceeds total budget {bs['total_budget']}"
-            )
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-
-
-# ---------------------------------------------------------------------------
-# Property 5: Open threads injection respects top-k limit
-# **Validates: Requirements 2.6**
-# ---------------------------------------------------------------------------
-
-
-class TestProperty5OpenThreadsTopKLimit:
-    """Property 5: Open threads injection respects top-k limit."""
+    Property 8: Context_Pack structural completeness and budget invariant.
+    Property 5: Open threads injection respects top-k limit.
+    """
 
     @given(
         chapter_number=st.integers(min_value=1, max_value=20),
         chapters=_project_chapters,
         top_k=st.integers(min_value=1, max_value=15),
     )
-    @settings(max_examples=100)
-    def test_open_threads_respects_top_k(self, chapter_number, chapters, top_k):
-        """Validates: Requirements 2.6"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            pack = svc.build_generation_context_pack(chapter_number, chapters, top_k_threads=top_k)
-
-            assert len(pack["open_threads"]) <= top_k, (
-                f"open_threads has {len(pack['open_threads'])} entries, exceeds top_k={top_k}"
-            )
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+    @settings(parent=_IO_BOUND)
+    def test_context_pack_all_invariants(self, svc_env, chapter_number, chapters, top_k):
+        """Validates: Requirements 2.6, 5.1, 5.2"""
+        svc_env.reset()
+        svc = svc_env.svc
+        pack = svc.build_generation_context_pack(chapter_number, chapters, top_k_threads=top_k)
+
+        # All 7 required keys
+        required_keys = {
+            "identity_core",
+            "runtime_state",
+            "memory_compact",
+            "previous_chapter_synopsis",
+            "open_threads",
+            "previous_chapters_compact",
+            "budget_stats",
+        }
+        assert required_keys.issubset(pack.keys()), (
+            f"Missing keys: {required_keys - pack.keys()}"
+        )
+
+        # Budget invariant: sum of *_used <= total_budget
+        bs = pack["budget_stats"]
+        used_fields = [
+            bs["identity_core_used"],
+            bs["runtime_state_used"],
+            bs["memory_compact_used"],
+            bs["previous_synopsis_used"],
+            bs["open_threads_used"],
+            bs["previous_chapters_used"],
+        ]
+        total_used = sum(used_fields)
+        assert total_used <= bs["total_budget"], (
+            f"Total used {total_used} exceeds total budget {bs['total_budget']}"
+        )
+
+        # Top-k limit on injected open threads
+        assert len(pack["open_threads"]) <= top_k, (
+            f"open_threads has {len(pack['open_threads'])} entries, exceeds top_k={top_k}"
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -556,40 +555,33 @@ class TestProperty2ThresholdRewriteTriggersAt3:
     """Property 2: Threshold rewrite triggers at chapter multiples of 3."""
 
     @given(chapter_number=st.integers(min_value=1, max_value=30))
-    @settings(max_examples=100)
-    def test_threshold_rewrite_trigger_condition(self, chapter_number):
+    @settings(parent=_IO_BOUND)
+    def test_threshold_rewrite_trigger_condition(self, svc_env, chapter_number):
         """Validates: Requirements 1.4, 3.1, 6.3"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-
-            chapters = [
-                {"chapter_number": i, "plan": None, "draft": f"Text for ch {i}", "final": None}
-                for i in range(1, chapter_number + 1)
-            ]
-
-            result = svc.refresh_memory_after_chapter(
-                chapter_number=chapter_number,
-                chapter_text=f"Chapter {chapter_number} text content",
-                chapter_plan=None,
-                project_chapters=chapters,
-                mode="consolidated",
-            )
+        svc_env.reset()
+        svc = svc_env.svc
+        chapters = [
+            {"chapter_number": i, "plan": None, "draft": f"Text for ch {i}", "final": None}
+            for i in range(1, chapter_number + 1)
+        ]
 
-            if chapter_number % 3 == 0:
-                assert result.get("threshold_rewrite") is not None, (
-                    f"Threshold rewrite should trigger at chapter {chapter_number} (multiple of 3)"
-                )
-                assert result["threshold_rewrite"]["memory_rewritten"] is True
-            else:
-                assert result.get("threshold_rewrite") is None, (
-                    f"Threshold rewrite should NOT trigger at chapter {chapter_number}"
-                )
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        result = svc.refresh_memory_after_chapter(
+            chapter_number=chapter_number,
+            chapter_text=f"Chapter {chapter_number} text content",
+            chapter_plan=None,
+            project_chapters=chapters,
+            mode="consolidated",
+        )
+
+        if chapter_number % 3 == 0:
+            assert result.get("threshold_rewrite") is not None, (
+                f"Threshold rewrite should trigger at chapter {chapter_number} (multiple of 3)"
+            )
+            assert result["threshold_rewrite"]["memory_rewritten"] is True
+        else:
+            assert result.get("threshold_rewrite") is None, (
+                f"Threshold rewrite should NOT trigger at chapter {chapter_number}"
+            )
 
 
 # ---------------------------------------------------------------------------
@@ -602,40 +594,31 @@ class TestProperty6LightweightRefreshAppends:
     """Property 6: Lightweight refresh appends without compression."""
 
     @given(chapter_number=st.integers(min_value=1, max_value=10))
-    @settings(max_examples=50, deadline=400)
-    def test_lightweight_memory_monotonic_growth(self, chapter_number):
+    @settings(parent=_IO_BOUND)
+    def test_lightweight_memory_monotonic_growth(self, svc_env, chapter_number):
         """Validates: Requirements 3.3"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-
-            memory_path = tlm.l2_dir / "MEMORY.md"
-            sizes = []
-
-            for i in range(1, chapter_number + 1):
-                chapters = [
-                    {"chapter_number": j, "plan": None, "draft": None, "final": None}
-                    for j in range(1, i + 1)
-                ]
-                svc.refresh_memory_after_chapter(
-                    chapter_number=i,
-                    chapter_text=f"Chapter {i} content",
-                    chapter_plan=None,
-                    project_chapters=chapters,
-                    mode="lightweight",
-                )
-                sizes.append(memory_path.stat().st_size)
+        svc_env.reset()
+        svc, tlm = svc_env.svc, svc_env.tlm
+        memory_path = tlm.l2_dir / "MEMORY.md"
+        sizes = []
+        chapters = []
+
+        for i in range(1, chapter_number + 1):
+            chapters.append({"chapter_number": i, "plan": None, "draft": None, "final": None})
+            svc.refresh_memory_after_chapter(
+                chapter_number=i,
+                chapter_text=f"Chapter {i} content",
+                chapter_plan=None,
+                project_chapters=chapters,
+                mode="lightweight",
+            )
+            sizes.append(memory_path.stat().st_size)
 
-            # Monotonic growth
-            for j in range(1, len(sizes)):
-                assert sizes[j] >= sizes[j - 1], (
-                    f"MEMORY.md size decreased from {sizes[j - 1]} to {sizes[j]} at step {j}"
-                )
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Monotonic growth
+        for j in range(1, len(sizes)):
+            assert sizes[j] >= sizes[j - 1], (
+                f"MEMORY.md size decreased from {sizes[j - 1]} to {sizes[j]} at step {j}"
+            )
 
 
 # ---------------------------------------------------------------------------
@@ -651,36 +634,27 @@ class TestProperty1IdentityPreservation:
         call_count=st.integers(min_value=1, max_value=5),
         mode=st.sampled_from(["lightweight", "consolidated"]),
     )
-    @settings(max_examples=50)
-    def test_identity_unchanged_after_operations(self, call_count, mode):
+    @settings(parent=_IO_BOUND)
+    def test_identity_unchanged_after_operations(self, svc_env, call_count, mode):
         """Validates: Requirements 1.2"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-
-            identity_before = tlm.get_identity()
-
-            for i in range(1, call_count + 1):
-                chapters = [
-                    {"chapter_number": j, "plan": None, "draft": None, "final": None}
-                    for j in range(1, i + 1)
-                ]
-                svc.refresh_memory_after_chapter(
-                    chapter_number=i,
-                    chapter_text=f"Chapter {i} text",
-                    chapter_plan=None,
-                    project_chapters=chapters,
-                    mode=mode,
-                )
-                svc.recompute_open_threads(chapters)
+        svc_env.reset()
+        svc, tlm = svc_env.svc, svc_env.tlm
+        identity_before = tlm.get_identity()
+        chapters = []
+
+        for i in range(1, call_count + 1):
+            chapters.append({"chapter_number": i, "plan": None, "draft": None, "final": None})
+            svc.refresh_memory_after_chapter(
+                chapter_number=i,
+                chapter_text=f"Chapter {i} text",
+                chapter_plan=None,
+                project_chapters=chapters,
+                mode=mode,
+            )
+            svc.recompute_open_threads(chapters)
 
-            identity_after = tlm.get_identity()
-            assert identity_after == identity_before, "IDENTITY.md was modified!"
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        identity_after = tlm.get_identity()
+        assert identity_after == identity_before, "IDENTITY.md was modified!"
 
 
 # ---------------------------------------------------------------------------
@@ -688,9 +662,6 @@ class TestProperty1IdentityPreservation:
 # **Validates: Requirements 6.2**
 # ---------------------------------------------------------------------------
 
-import ast
-import textwrap
-
 
 class TestProperty12ConsolidatedRefreshAllApprovalPathways:
     """Property 12: Consolidated refresh is triggered by all approval pathways.
@@ -704,26 +675,10 @@ class TestProperty12ConsolidatedRefreshAllApprovalPathways:
     exist and are correctly configured.
     """
 
-    _SOURCE_PATH = Path(__file__).resolve().parent.parent / "api" / "main.py"
-
-    def _read_source(self) -> str:
-        return self._SOURCE_PATH.read_text(encoding="utf-8")
-
-    def _extract_function_source(self, source: str, func_name: str) -> str:
-        """Extract the source code of a top-level async/sync function by name."""
-        tree = ast.parse(source)
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                if node.name == func_name:
-                    lines = source.splitlines()
-                    return "\n".join(lines[node.lineno - 1 : node.end_lineno])
-        raise ValueError(f"Function {func_name!r} not found in source")
-
-    @given(
-        pathway=st.sampled_from(["review_chapter", "run_one_shot_book_generation", "commit_memory"])
+    @pytest.mark.parametrize(
+        "pathway", ["review_chapter", "run_one_shot_book_generation", "commit_memory"]
     )
-    @settings(max_examples=10)
-    def test_approval_pathways_call_consolidated_refresh(self, pathway: str):
+    def test_approval_pathways_call_consolidated_refresh(self, main_source_funcs, pathway: str):
         """
         **Validates: Requirements 6.2**
 
@@ -731,8 +686,7 @@ class TestProperty12ConsolidatedRefreshAllApprovalPathways:
         1. It contains a call to refresh_memory_after_chapter
         2. The call uses mode="consolidated"
         """
-        source = self._read_source()
-        func_source = self._extract_function_source(source, pathway)
+        func_source = main_source_funcs[pathway]
 
         # Must contain refresh_memory_after_chapter call
         assert "refresh_memory_after_chapter" in func_source, (
@@ -744,16 +698,13 @@ class TestProperty12ConsolidatedRefreshAllApprovalPathways:
             f'{pathway} does not pass mode="consolidated" to refresh_memory_after_chapter'
         )
 
-    @given(data=st.data())
-    @settings(max_examples=10)
-    def test_finalize_uses_lightweight_not_consolidated(self, data):
+    def test_finalize_uses_lightweight_not_consolidated(self, main_source_funcs):
         """
         **Validates: Requirements 6.1**
 
         finalize_generated_draft should use mode="lightweight", NOT "consolidated".
         """
-        source = self._read_source()
-        func_source = self._extract_function_source(source, "finalize_generated_draft")
+        func_source = main_source_funcs["finalize_generated_draft"]
 
         assert "refresh_memory_after_chapter" in func_source, (
             "finalize_generated_draft does not call refresh_memory_after_chapter"
@@ -762,39 +713,57 @@ class TestProperty12ConsolidatedRefreshAllApprovalPathways:
             'finalize_generated_draft should use mode="lightweight"'
         )
 
-    @given(data=st.data())
-    @settings(max_examples=10)
-    def test_delete_chapter_calls_recompute_open_threads(self, data):
+    def test_delete_chapter_calls_recompute_open_threads(self, main_source_funcs):
         """
         **Validates: Requirements 6.4**
 
         _delete_chapter_internal should call recompute_open_threads.
         """
-        source = self._read_source()
-        func_source = self._extract_function_source(source, "_delete_chapter_internal")
+        func_source = main_source_funcs["_delete_chapter_internal"]
 
         assert "recompute_open_threads" in func_source, (
             "_delete_chapter_internal does not call recompute_open_threads"
         )
 
-    def test_all_three_consolidated_pathways_present(self):
+    def test_all_three_consolidated_pathways_present(self, main_source_funcs):
         """
         **Validates: Requirements 6.2**
 
         Non-property sanity check: all three approval pathways exist and
         each calls refresh_memory_after_chapter(mode="consolidated").
         """
-        source = self._read_source()
         pathways = ["review_chapter", "run_one_shot_book_generation", "commit_memory"]
 
         for pathway in pathways:
-            func_source = self._extract_function_source(source, pathway)
+            func_source = main_source_funcs[pathway]
             assert "refresh_memory_after_chapter" in func_source, (
                 f"{pathway} missing refresh_memory_after_chapter call"
             )
             assert 'mode="consolidated"' in func_source, f'{pathway} missing mode="consolidated"'
 
 
+def _pack_for(env, chapter_number: int, chapters: list[dict]) -> dict:
+    """Context pack for a freshly reset *env*, memoised on the env by the exact chapter input.
+
+    Only for read-only shape checks (Properties 13 and 15): the cached dict is shared
+    between examples, and a hit skips ``env.reset()``. Property 14 mutates the store
+    and must call the service directly.
+    """
+    key = (chapter_number, json.dumps(chapters, sort_keys=True))
+    pack = env.pack_cache.get(key)
+    if pack is None:
+        env.reset()
+        pack = env.pack_cache[key] = env.svc.build_generation_context_pack(
+            chapter_number, chapters
+        )
+    return pack
+
+
+# Properties 13 and 15 only check pack shape: a small fixed example set, the same
+# on every run, so pack_cache hits are predictable and no entropy is drawn.
+_SHAPE_CHECK = settings(_IO_BOUND, max_examples=10, derandomize=True)
+
+
 # ---------------------------------------------------------------------------
 # Property 13: Pre-generation context logging is complete
 # **Validates: Requirements 8.2**
@@ -808,36 +777,32 @@ class TestProperty13PreGenerationContextLogging:
         chapter_number=st.integers(min_value=1, max_value=20),
         chapters=_project_chapters,
     )
-    @settings(max_examples=50)
-    def test_budget_stats_has_all_logging_fields(self, chapter_number, chapters):
+    @settings(parent=_SHAPE_CHECK)
+    def test_budget_stats_has_all_logging_fields(self, svc_env, chapter_number, chapters):
         """Validates: Requirements 8.2"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            pack = svc.build_generation_context_pack(chapter_number, chapters)
-
-            bs = pack["budget_stats"]
-            required_logging_fields = [
-                "total_budget",
-                "identity_core_used",
-                "runtime_state_used",
-                "memory_compact_used",
-                "previous_synopsis_used",
-                "open_threads_used",
-                "previous_chapters_used",
-            ]
-            for field in required_logging_fields:
-                assert field in bs, f"budget_stats missing logging field: {field}"
-                assert isinstance(bs[field], (int, float)), (
-                    f"budget_stats[{field}] should be numeric"
-                )
+        pack = _pack_for(svc_env, chapter_number, chapters)
+
+        bs = pack["budget_stats"]
+        required_logging_fields = [
+            "total_budget",
+            "identity_core_used",
+            "runtime_state_used",
+            "memory_compact_used",
+            "previous_synopsis_used",
+            "open_threads_used",
+            "previous_chapters_used",
+        ]
+        for field in required_logging_fields:
+            assert field in bs, f"budget_stats missing logging field: {field}"
+            assert isinstance(bs[field], (int, float)), (
+                f"budget_stats[{field}] should be numeric"
+            )
 
-            assert isinstance(pack["open_threads"], list), "open_threads should be a list"
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Steer the few examples towards packs that nearly exhaust the budget.
+        slack = bs["total_budget"] - sum(bs[f] for f in required_logging_fields[1:])
+        target(-slack, label="budget_slack")
+
+        assert isinstance(pack["open_threads"], list), "open_threads should be a list"
 
 
 # ---------------------------------------------------------------------------
@@ -846,47 +811,62 @@ class TestProperty13PreGenerationContextLogging:
 # ---------------------------------------------------------------------------
 
 
+class MemoryRefreshMachine(RuleBasedStateMachine):
+    """Refresh chapter after chapter on one memory service, checking each writeback result."""
+
+    def __init__(self, env) -> None:
+        super().__init__()
+        env.reset()
+        self.svc = env.svc
+        self.chapters: list[dict] = []
+
+    @rule(mode=st.sampled_from(["lightweight", "consolidated"]))
+    def refresh(self, mode: str) -> None:
+        chapter_number = len(self.chapters) + 1
+        self.chapters.append(
+            {
+                "chapter_number": chapter_number,
+                "plan": None,
+                "draft": f"Ch {chapter_number}",
+                "final": None,
+            }
+        )
+
+        result = self.svc.refresh_memory_after_chapter(
+            chapter_number=chapter_number,
+            chapter_text=f"Chapter {chapter_number} text",
+            chapter_plan=None,
+            project_chapters=self.chapters,
+            mode=mode,
+        )
+
+        assert isinstance(result, dict), "refresh result should be a dict"
+        assert "mode" in result, "result should contain 'mode'"
+        assert result["mode"] == mode
+
+        if mode == "consolidated" and chapter_number % 3 == 0:
+            tr = result.get("threshold_rewrite")
+            assert tr is not None, "threshold_rewrite should be present at multiples of 3"
+            assert "duration_s" in tr, "threshold_rewrite should have duration_s"
+            assert "memory_rewritten" in tr, "threshold_rewrite should have memory_rewritten"
+
+
 class TestProperty14WritebackLoggingFields:
     """Property 14: Writeback logging reports threshold and file outputs."""
 
-    @given(
-        chapter_number=st.integers(min_value=1, max_value=15),
-        mode=st.sampled_from(["lightweight", "consolidated"]),
-    )
-    @settings(max_examples=50)
-    def test_refresh_result_has_logging_fields(self, chapter_number, mode):
+    def test_refresh_result_has_logging_fields(self, svc_env):
         """Validates: Requirements 8.3"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-
-            chapters = [
-                {"chapter_number": i, "plan": None, "draft": f"Ch {i}", "final": None}
-                for i in range(1, chapter_number + 1)
-            ]
-
-            result = svc.refresh_memory_after_chapter(
-                chapter_number=chapter_number,
-                chapter_text=f"Chapter {chapter_number} text",
-                chapter_plan=None,
-                project_chapters=chapters,
-                mode=mode,
-            )
-
-            assert isinstance(result, dict), "refresh result should be a dict"
-            assert "mode" in result, "result should contain 'mode'"
-            assert result["mode"] == mode
-
-            if mode == "consolidated" and chapter_number % 3 == 0:
-                tr = result.get("threshold_rewrite")
-                assert tr is not None, "threshold_rewrite should be present at multiples of 3"
-                assert "duration_s" in tr, "threshold_rewrite should have duration_s"
-                assert "memory_rewritten" in tr, "threshold_rewrite should have memory_rewritten"
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Unlike the other I/O-bound properties, keep the example database: replaying a
+        # previously failing refresh sequence is the point of a stateful test.
+        run_state_machine_as_test(
+            lambda: MemoryRefreshMachine(svc_env),
+            settings=settings(
+                _IO_BOUND,
+                max_examples=5,
+                stateful_step_count=9,
+                database=settings.default.database,
+            ),
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -902,26 +882,18 @@ class TestProperty15PlanQualityWarningContextPackStats:
         chapter_number=st.integers(min_value=1, max_value=20),
         chapters=_project_chapters,
     )
-    @settings(max_examples=50)
-    def test_context_pack_has_plan_quality_warning_fields(self, chapter_number, chapters):
+    @settings(parent=_SHAPE_CHECK)
+    def test_context_pack_has_plan_quality_warning_fields(self, svc_env, chapter_number, chapters):
         """Validates: Requirements 8.4"""
-        tmp_dir = tempfile.mkdtemp()
-        try:
-            tlm = ThreeLayerMemory(tmp_dir)
-            db_path = Path(tmp_dir) / "test.db"
-            ms = MemoryStore(tmp_dir, str(db_path))
-            svc = MemoryContextService(tlm, ms)
-            pack = svc.build_generation_context_pack(chapter_number, chapters)
-
-            # The plan quality warning log references these fields
-            assert "budget_stats" in pack
-            assert "total_budget" in pack["budget_stats"]
-            assert "open_threads" in pack
-            assert "identity_core_used" in pack["budget_stats"]
-
-            # All referenced fields should be accessible without KeyError
-            _ = pack["budget_stats"]["total_budget"]
-            _ = len(pack["open_threads"])
-            _ = pack["budget_stats"]["identity_core_used"]
-        finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+        pack = _pack_for(svc_env, chapter_number, chapters)
+
+        # The plan quality warning log references these fields
+        assert "budget_stats" in pack
+        assert "total_budget" in pack["budget_stats"]
+        assert "open_threads" in pack
+        assert "identity_core_used" in pack["budget_stats"]
+
+        # All referenced fields should be accessible without KeyError
+        _ = pack["budget_stats"]["total_budget"]
+        _ = len(pack["open_threads"])
+        _ = pack["budget_stats"]["identity_core_used"]
@@ -5,11 +5,13 @@ from models import Chapter
 
 
 class StudioPlanParserTest(unittest.TestCase):
-    def _workflow(self) -> StudioWorkflow:
-        return StudioWorkflow(studio=object(), memory_search_func=lambda *_args, **_kwargs: [])
-
-    def _chapter(self) -> Chapter:
-        return Chapter(
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Read-only inputs; tests that need a variant take a model_copy.
+        cls.workflow = StudioWorkflow(
+            studio=object(), memory_search_func=lambda *_args, **_kwargs: []
+        )
+        cls.chapter = Chapter(
             id="ch-1",
             project_id="p-1",
             chapter_number=1,
@@ -18,8 +20,7 @@ class StudioPlanParserTest(unittest.TestCase):
         )
 
     def test_extract_plan_payload_from_markdown_sections(self):
-        workflow = self._workflow()
-        chapter = self._chapter()
+        workflow, chapter = self.workflow, self.chapter
         text = """
 节拍
 1. 陈砚完成初步定位，但发现密钥信号被人为伪装。
@@ -46,17 +47,30 @@ class StudioPlanParserTest(unittest.TestCase):
         self.assertEqual(parsed["role_goals"].get("陈砚"), "在接口崩溃前拿到真实入口坐标。")
 
     def test_extract_plan_payload_fallback_is_not_rigid_template(self):
-        workflow = self._workflow()
-        chapter = self._chapter()
+        workflow, chapter = self.workflow, self.chapter
         parsed = workflow._extract_plan_payload("（模型返回异常）", chapter)
         self.assertGreaterEqual(len(parsed["beats"]), 3)
         self.assertNotIn("中段制造冲突并推进人物关系", parsed["beats"])
         self.assertNotIn("结尾留下悬念或下一章引子", parsed["beats"])
         self.assertNotIn("主角目标与外部阻力发生碰撞", parsed["conflicts"])
 
+    def test_extract_plan_payload_cached_result_is_not_shared(self):
+        chapter = self.chapter
+        first, quality = self.workflow._extract_plan_payload_with_quality("（缓存）", chapter)
+        first["beats"].append("调用方追加的节拍")
+        quality["attempts"] = 2
+        second, second_quality = self.workflow._extract_plan_payload_with_quality(
+            "（缓存）", chapter
+        )
+        self.assertNotIn("调用方追加的节拍", second["beats"])
+        self.assertNotIn("attempts", second_quality)
+
+        edited = chapter.model_copy(update={"goal": "陈砚放弃校准，转而追踪诱饵信号的来源。"})
+        reparsed = self.workflow._extract_plan_payload("（缓存）", edited)
+        self.assertNotEqual(reparsed["beats"], second["beats"])
+
     def test_extract_plan_quality_marks_template_output(self):
-        workflow = self._workflow()
-        chapter = self._chapter()
+        workflow, chapter = self.workflow, self.chapter
         template_text = """
 {
   "beats": [
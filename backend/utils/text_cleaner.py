@@ -4,19 +4,22 @@ and extracting keywords for fallback thread resolution matching.
 """
 
 import re
+from collections.abc import Iterator, Set
+from functools import lru_cache
+from itertools import islice
 
 # Configurable blocklist of pseudo-field words commonly found in blueprint plans
-DEFAULT_BLOCKLIST: set[str] = {
+DEFAULT_BLOCKLIST: frozenset[str] = frozenset({
     "id", "description", "item", "target",
     "source_chapter", "potential_use", "type", "goal",
-}
+})
 
 # Chinese stopwords for keyword extraction
-KEYWORD_STOPWORDS: set[str] = {
+KEYWORD_STOPWORDS: frozenset[str] = frozenset({
     "的", "了", "和", "与", "在", "是", "有", "不", "这", "那",
     "也", "都", "就", "而", "但", "又", "或", "被", "把", "对",
     "从", "向", "为", "以", "到", "让", "给", "用", "将", "会",
-}
+})
 
 MIN_KEYWORD_LENGTH: int = 2
 
@@ -24,8 +27,39 @@ MIN_KEYWORD_LENGTH: int = 2
 # underscore) or individual CJK characters.
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9_]+|[\u4e00-\u9fff]")
 
-
-def is_pseudo_field_line(line: str, blocklist: set[str] | None = None) -> bool:
+# bytes.translate table keeping _TOKEN_RE's ASCII word bytes and blanking the rest.
+_ASCII_WORD_BYTES = frozenset(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+)
+_ASCII_WORD_TABLE = bytes(i if i in _ASCII_WORD_BYTES else 0x20 for i in range(256))
+_DEFAULT_BLOCKLIST_BYTES = frozenset(w.encode("ascii") for w in DEFAULT_BLOCKLIST)
+
+# Whole-line match for boilerplate made only of default-blocklist words and
+# punctuation ("- id:", "type, goal"). The separator class is the complement of
+# _TOKEN_RE's, so a hit means every token is blocklisted; longest alternatives
+# first keep "source_chapter" from stopping at a shorter word.
+_NON_TOKEN = r"[^a-zA-Z0-9_\u4e00-\u9fff]"
+_BLOCKLIST_ALT = "|".join(map(re.escape, sorted(DEFAULT_BLOCKLIST, key=len, reverse=True)))
+_PURE_PSEUDO_RE = re.compile(
+    rf"{_NON_TOKEN}*(?:{_BLOCKLIST_ALT})(?:{_NON_TOKEN}+(?:{_BLOCKLIST_ALT}))*{_NON_TOKEN}*",
+    re.IGNORECASE | re.ASCII,
+)
+
+# Tokens are either ASCII word runs or single CJK characters. Anything sorting
+# above this bound is CJK, which has no case, so ``.lower()`` can be skipped.
+_ASCII_MAX = "\x7f"
+
+# _TOKEN_RE plus every boundary str.splitlines() breaks on, so a single scan can
+# attribute tokens to lines.
+_LINE_BREAKS: frozenset[str] = frozenset(
+    {"\r\n", "\n", "\r", "\v", "\f", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029"}
+)
+_LINE_TOKEN_RE = re.compile(
+    r"[a-zA-Z0-9_]+|[\u4e00-\u9fff]|\r\n|[\n\r\v\f\x1c-\x1e\x85\u2028\u2029]"
+)
+
+
+def is_pseudo_field_line(line: str, blocklist: Set[str] | None = None) -> bool:
     """
     Determine if a line consists primarily of blocklisted/pseudo-field words.
 
@@ -40,23 +74,44 @@ def is_pseudo_field_line(line: str, blocklist: set[str] | None = None) -> bool:
     Returns:
         True if blocklisted tokens ratio > 50%, False otherwise.
     """
-    if blocklist is None:
-        blocklist = DEFAULT_BLOCKLIST
+    if blocklist is None or blocklist is DEFAULT_BLOCKLIST:
+        return _is_pseudo_field_line_default(line)
+    return _is_pseudo_field_line(line, blocklist)
+
 
+def _is_pseudo_field_line(line: str, blocklist: Set[str]) -> bool:
     tokens = _TOKEN_RE.findall(line)
     if not tokens:
         return False
 
-    blocked_count = sum(1 for t in tokens if t.lower() in blocklist)
-    return blocked_count / len(tokens) > 0.5
+    blocked_count = sum(
+        1 for t in tokens if (t if t > _ASCII_MAX else t.lower()) in blocklist
+    )
+    return blocked_count * 2 > len(tokens)
+
+
+# Blueprint boilerplate repeats the same lines across chapters; the default
+# blocklist is immutable, so results keyed on the text alone stay valid.
+@lru_cache(maxsize=4096)
+def _is_pseudo_field_line_default(line: str) -> bool:
+    if _PURE_PSEUDO_RE.fullmatch(line):
+        return True
+    if line.isascii():
+        # For ASCII input, mapping every non-word byte to a space and splitting
+        # yields exactly _TOKEN_RE's tokens, with the scan done in C.
+        tokens = line.encode("ascii").lower().translate(_ASCII_WORD_TABLE).split()
+        blocked_count = sum(1 for t in tokens if t in _DEFAULT_BLOCKLIST_BYTES)
+        return blocked_count * 2 > len(tokens)
+    return _is_pseudo_field_line(line, DEFAULT_BLOCKLIST)
 
 
-def clean_foreshadowing_text(text: str, blocklist: set[str] | None = None) -> str:
+def clean_foreshadowing_text(text: str, blocklist: Set[str] | None = None) -> str:
     """
     Filter lines from foreshadowing text that consist primarily of blocklisted tokens.
 
-    Processes each line through ``is_pseudo_field_line`` and removes lines where
-    the blocklisted token ratio exceeds 50%.
+    Applies the ``is_pseudo_field_line`` rule to every line, tokenizing the whole
+    text in a single pass, and removes lines where the blocklisted token ratio
+    exceeds 50%.
 
     Args:
         text: The raw foreshadowing text (may be multi-line).
@@ -69,51 +124,88 @@ def clean_foreshadowing_text(text: str, blocklist: set[str] | None = None) -> st
     if not text:
         return ""
 
-    if blocklist is None:
-        blocklist = DEFAULT_BLOCKLIST
-
-    kept_lines: list[str] = []
-    for line in text.splitlines():
-        stripped = line.strip()
-        if not stripped:
-            # Preserve blank lines for readability
-            kept_lines.append(line)
+    if blocklist is None or blocklist is DEFAULT_BLOCKLIST:
+        return _clean_foreshadowing_text_default(text)
+    return _clean_foreshadowing_text(text, blocklist)
+
+
+def _clean_foreshadowing_text(text: str, blocklist: Set[str]) -> str:
+    # One tokenizer pass over the whole text: line breaks come back as tokens of
+    # their own and advance the line counter.
+    lines = text.splitlines()
+    totals = [0] * (len(lines) + 1)
+    blocked = [0] * (len(lines) + 1)
+    idx = 0
+    for token in _LINE_TOKEN_RE.findall(text):
+        if token in _LINE_BREAKS:
+            idx += 1
             continue
-        if not is_pseudo_field_line(stripped, blocklist):
-            kept_lines.append(line)
-
+        totals[idx] += 1
+        if (token if token > _ASCII_MAX else token.lower()) in blocklist:
+            blocked[idx] += 1
+
+    # Same rule as is_pseudo_field_line; blank and token-less lines are kept.
+    kept_lines = [
+        line for line, total, hits in zip(lines, totals, blocked) if hits * 2 <= total
+    ]
     return "\n".join(kept_lines)
 
 
-def extract_keywords(text: str, min_length: int = MIN_KEYWORD_LENGTH) -> list[str]:
+@lru_cache(maxsize=4096)
+def _clean_foreshadowing_text_default(text: str) -> str:
+    # Open threads are recomputed from every chapter's foreshadowing on each
+    # refresh and context build, so the same items are cleaned over and over.
+    return _clean_foreshadowing_text(text, DEFAULT_BLOCKLIST)
+
+
+def iter_keywords(text: str, min_length: int = MIN_KEYWORD_LENGTH) -> Iterator[str]:
     """
-    Extract keywords from text with minimum length threshold and stopword removal.
+    Lazily yield keywords from text with minimum length threshold and stopword removal.
 
-    Used for fallback thread resolution matching in foreshadowing recovery.
+    Tokenizes only as far as the caller consumes, so stopping early on long
+    chapter texts skips the rest of the scan.
 
     Args:
         text: Input text to extract keywords from.
         min_length: Minimum character length for a keyword (default 2).
 
-    Returns:
-        List of unique keywords that pass length and stopword filters,
-        preserving first-occurrence order.
+    Yields:
+        Unique keywords that pass length and stopword filters, in
+        first-occurrence order.
     """
     if not text:
-        return []
-
-    tokens = _TOKEN_RE.findall(text)
+        return
 
     seen: set[str] = set()
-    keywords: list[str] = []
-    for token in tokens:
-        t = token.lower()
-        if len(t) < min_length:
-            continue
-        if t in KEYWORD_STOPWORDS:
+    for match in _TOKEN_RE.finditer(text):
+        token = match.group()
+        t = token if token > _ASCII_MAX else token.lower()
+        if len(t) < min_length or t in KEYWORD_STOPWORDS or t in seen:
             continue
-        if t not in seen:
-            seen.add(t)
-            keywords.append(t)
+        seen.add(t)
+        yield t
 
-    return keywords
+
+def extract_keywords(
+    text: str,
+    min_length: int = MIN_KEYWORD_LENGTH,
+    max_keywords: int | None = None,
+) -> list[str]:
+    """
+    Extract keywords from text with minimum length threshold and stopword removal.
+
+    Used for fallback thread resolution matching in foreshadowing recovery.
+
+    Args:
+        text: Input text to extract keywords from.
+        min_length: Minimum character length for a keyword (default 2).
+        max_keywords: Optional cap; tokenizing stops once this many are found.
+
+    Returns:
+        List of unique keywords that pass length and stopword filters,
+        preserving first-occurrence order.
+    """
+    keywords = iter_keywords(text, min_length)
+    if max_keywords is None:
+        return list(keywords)
+    return list(islice(keywords, max_keywords))